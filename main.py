@@ -1,4 +1,6 @@
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import List, Optional, Tuple
 from paging_model import Page, Request
 from online_algorithm import OnlineVariableCacheSystem
 from offline_solver import OfflineOptimalSolver
@@ -6,11 +8,11 @@ from offline_solver_visualization import visualize_solution
 from recursive_request_sequence import generate_recursive_sequence
 
 
-def run_experiment():
+def run_experiment(
+    N: int = 3, T_val: int = 2, A_val: int = 3, verbose: bool = True
+) -> Tuple[float, float]:
     # --- Configuration - --
-    N = 3  # Number of pages
-    T_val = 2  # Base weight t
-    A_val = 3
+    # N: Number of pages, T_val: Base weight t, A_val: Requests between P_i's
 
     # Generate Sequence
     pages, requests = generate_recursive_sequence(N, T_val, A_val)
@@ -20,6 +22,13 @@ def run_experiment():
     L = len(requests)
     capacities = {i: 2 for i in range(1, L + 2)}
 
+    if not verbose:
+        online_sys = OnlineVariableCacheSystem(pages, capacities)
+        online_cost, _ = online_sys.run(requests, need_history=False)
+        offline_solver = OfflineOptimalSolver(pages, requests, capacities)
+        off_cost, _ = offline_solver.solve(verbose=False, need_states=False)
+        return online_cost, off_cost
+
     print("==========================================")
     print(f"Experiment: {requests}")
     print(f"Capacities: {capacities}")
@@ -27,7 +36,7 @@ def run_experiment():
 
     # 2. Run Online Algorithm
     print(">>> Running Online Algorithm (Greedy Oracle)...")
-    online_sys = OnlineVariableCacheSystem(pages, capacities)
+    online_sys = OnlineVariableCacheSystem(pages, capacities, verbose=True)
     online_cost, on_states = online_sys.run(requests)
     print(f"Online Total Cost: {online_cost}\n")
     print("Online Schedule:")
@@ -60,6 +69,29 @@ def run_experiment():
     )
     print("==========================================")
 
+    return online_cost, off_cost
+
+
+def _run_quiet(params: Tuple[int, int, int]) -> Tuple[float, float]:
+    N, T_val, A_val = params
+    return run_experiment(N, T_val, A_val, verbose=False)
+
+
+def run_sweep(
+    grid: List[Tuple[int, int, int]], max_workers: Optional[int] = None
+) -> List[Tuple[float, float]]:
+    """
+    Runs one quiet experiment per (N, T_val, A_val) in grid, in parallel.
+    Returns the (online_cost, off_cost) pairs in grid order.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(_run_quiet, grid))
+
 
 if __name__ == "__main__":
     run_experiment()
+
+    grid = list(product([2, 3], [2, 3], [2, 3]))
+    print("\nSweep (N, t, a): Online / Optimal")
+    for (N, T_val, A_val), (online_cost, off_cost) in zip(grid, run_sweep(grid)):
+        print(f"  ({N}, {T_val}, {A_val}): {online_cost} / {off_cost}")
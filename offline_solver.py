@@ -1,33 +1,87 @@
 import networkx as nx
-from typing import List, Dict, Tuple, Any
-from paging_model import Page, Request, CacheState
+import numpy as np
+from itertools import repeat
+from typing import List, Dict, Tuple, Any, Optional, Union
+from paging_model import Page, Request, RequestStream, CacheState
+from paging_kernel import load_cost
+
+try:
+    from ortools.graph.python import min_cost_flow
+except ImportError:  # OR-Tools is optional, networkx is used as a fallback
+    min_cost_flow = None
 
 
 class OfflineOptimalSolver:
     def __init__(
-        self, pages: List[Page], requests: List[Request], capacities: Dict[int, int]
+        self,
+        pages: List[Page],
+        requests: Union[List[Request], RequestStream],
+        capacities: Dict[int, int],
     ):
         self.pages = pages
         self.requests = requests
         self.capacities = capacities
         self.page_to_idx = {p.id: i for i, p in enumerate(pages)}
         self.idx_to_page = {i: p for i, p in enumerate(pages)}
+        # Page weights by index, read in the graph-building loops
+        self._w = np.asarray([p.weight for p in pages], dtype=np.float64)
+        # Requested page index per time step
+        self._req_idx = self._prep()
         self.LARGE = 1_000_000
 
-    def solve(self) -> Tuple[float, List[CacheState]]:
+        # Solved graph and flow, shared between solve() and get_graph_for_viz()
+        self._G = None
+        self._flow = None
+
+    def solve(
+        self, verbose: bool = True, need_states: bool = True
+    ) -> Tuple[float, Optional[List[CacheState]]]:
+        """
+        Returns the optimal offline cost and its schedule. With
+        need_states=False the schedule is not reconstructed and None is
+        returned in its place.
+        """
         G = self._build_layered_graph()
         max_k = max(self.capacities.values()) if self.capacities else 1
 
         try:
-            flow_dict = nx.min_cost_flow(G)
+            flow_dict = self._min_cost_flow(G)
         except nx.NetworkXUnfeasible:
             print("Graph is infeasible.")
-            return 0.0, []
+            return 0.0, ([] if need_states else None)
 
-        states = self._reconstruct(G, flow_dict)
-        real_cost = self._calculate_real_cost(states, True)
+        self._G, self._flow = G, flow_dict
+
+        mask = self._occupancy_mask(flow_dict)
+        if not need_states:
+            return self._calculate_real_cost_from_mask(mask), None
+
+        states = self._reconstruct(mask)
+        if verbose:
+            real_cost = self._calculate_real_cost(states, True)
+        else:
+            real_cost = self._calculate_real_cost_from_mask(mask)
         return real_cost, states
 
+    def _prep(self) -> np.ndarray:
+        """
+        Encodes the request sequence once as an int32 array of page indices,
+        so the builder doesn't dereference Request/Page objects per layer.
+        """
+        if isinstance(self.requests, RequestStream):
+            stream = self.requests
+            to_idx = np.fromiter(
+                (self.page_to_idx[p.id] for p in stream.pages),
+                dtype=np.int32,
+                count=len(stream.pages),
+            )
+            return to_idx[stream.page_ids]
+        return np.fromiter(
+            (self.page_to_idx[r.page.id] for r in self.requests),
+            dtype=np.int32,
+            count=len(self.requests),
+        )
+
     def _calculate_real_cost_from_flow(self, G, flow_dict, verbose=False) -> float:
         """
         Calculates the real paging cost by summing positive weights on active flow edges.
@@ -37,29 +91,38 @@ class OfflineOptimalSolver:
         if verbose:
             print("\n=== Cost Breakdown (From Graph Edges) ===")
 
-        # Iterate over all nodes in flow dict
-        for u, neighbors in flow_dict.items():
-            for v, flow in neighbors.items():
-                if flow > 0.9:  # Flow exists
-
-                    # Get edge weight
-                    weight = G[u][v]["weight"]
-
-                    # In this formulation:
-                    # Positive Weight = Cost to Load/Switch Page
-                    # Negative Weight = Reward (-LARGE)
-                    # Zero Weight     = Free action (Hold/Evict)
-
-                    if weight > 0:
-                        total_cost += weight
-
-                        if verbose:
-                            # Format output for readability
-                            u_str = self._format_node(u)
-                            v_str = self._format_node(v)
-                            print(
-                                f"Edge ({u_str} -> {v_str}): Flow={int(flow)} * Weight={weight} = {weight}"
-                            )
+        # In this formulation:
+        # Positive Weight = Cost to Load/Switch Page
+        # Negative Weight = Reward (-LARGE)
+        # Zero Weight     = Free action (Hold/Evict)
+        if G is self._G:
+            # Positive edges were recorded while building the graph
+            edges = self._positive_cost_edges
+        else:
+            edges = [
+                (u, v, d["weight"]) for u, v, d in G.edges(data=True) if d["weight"] > 0
+            ]
+
+        for u, v, weight in edges:
+            flow = flow_dict.get(u, {}).get(v, 0)
+            if flow > 0.9:  # Flow exists
+                total_cost += weight
+
+                if verbose:
+                    # Format output for readability
+                    u_str = self._format_node(u)
+                    if self._id_to_node[u][1:] == ("switch",):
+                        # The switch node is shared, name the pages it took in
+                        switched_out = [
+                            self._format_node(p)
+                            for p in G.predecessors(u)
+                            if flow_dict.get(p, {}).get(u, 0) > 0.9
+                        ]
+                        u_str += f"[from {', '.join(switched_out)}]"
+                    v_str = self._format_node(v)
+                    print(
+                        f"Edge ({u_str} -> {v_str}): Flow={int(flow)} * Weight={weight} = {weight}"
+                    )
 
         if verbose:
             print(f"--- Total Real Cost: {total_cost} ---\n")
@@ -67,6 +130,7 @@ class OfflineOptimalSolver:
         return total_cost
 
     def _format_node(self, node):
+        node = self._id_to_node[node]
         if isinstance(node, str):
             return node
         if len(node) == 2:
@@ -79,9 +143,53 @@ class OfflineOptimalSolver:
         return f"L{layer}:{ntype}"
 
     def get_graph_for_viz(self):
-        G = self._build_layered_graph()
-        flow_dict = nx.min_cost_flow(G)
-        return G, flow_dict
+        if self._G is None:
+            G = self._build_layered_graph()
+            self._G, self._flow = G, self._min_cost_flow(G)
+        return self._G, self._flow
+
+    def _min_cost_flow(self, G: nx.DiGraph) -> Dict[Any, Dict[Any, int]]:
+        """
+        Solves min-cost flow on G with OR-Tools' network simplex when it is
+        installed, otherwise with networkx's network simplex. Returns a
+        networkx-style flow dict.
+        """
+        if min_cost_flow is None:
+            return nx.network_simplex(G)[1]
+
+        # Nodes are already the integer ids 0..N-1 assigned by _node_id
+        edges = list(G.edges(data=True))
+        m = len(edges)
+
+        tails = np.fromiter((u for u, _, _ in edges), dtype=np.int64, count=m)
+        heads = np.fromiter((v for _, v, _ in edges), dtype=np.int64, count=m)
+        caps = np.fromiter(
+            (d["capacity"] for _, _, d in edges), dtype=np.int64, count=m
+        )
+        costs = np.fromiter(
+            (d["weight"] for _, _, d in edges), dtype=np.float64, count=m
+        )
+        supplies = np.zeros(len(G), dtype=np.int64)
+        for node, demand in G.nodes(data="demand", default=0):
+            supplies[node] = -demand
+
+        # OR-Tools only supports integer costs
+        if not np.array_equal(costs, np.round(costs)):
+            return nx.network_simplex(G)[1]
+
+        smcf = min_cost_flow.SimpleMinCostFlow()
+        arcs = smcf.add_arcs_with_capacity_and_unit_cost(
+            tails, heads, caps, costs.astype(np.int64)
+        )
+        smcf.set_nodes_supplies(np.arange(len(G)), supplies)
+
+        if smcf.solve() != smcf.OPTIMAL:
+            raise nx.NetworkXUnfeasible("no flow satisfies all node demands")
+
+        flow_dict = {u: {} for u in G}
+        for (u, v, _), flow in zip(edges, smcf.flows(arcs).tolist()):
+            flow_dict[u][v] = flow
+        return flow_dict
 
     def _build_layered_graph(self) -> nx.DiGraph:
         G = nx.DiGraph()
@@ -89,130 +197,169 @@ class OfflineOptimalSolver:
         max_k = max(self.capacities.values()) if self.capacities else 1
         T = len(self.requests)
 
-        G.add_node("source", demand=-max_k)
-        G.add_node("sink", demand=max_k)
+        # Nodes are small ints, (layer, type[, idx]) keys live in a side-table
+        self._nid = {}
+        self._id_to_node = []
+        nid = self._node_id
+
+        # Page_In -> Page_Out edges of layers 1..T, in (t, i) order
+        self._internal_edges = []
+        # (u, v, weight) of every edge with a positive (load/switch) weight
+        self._positive_cost_edges = []
+
+        # All edges are collected as (u, v, data) and inserted in one batch.
+        # networkx copies the data dicts, so layers can share these templates.
+        edges = []
+        free = {"capacity": 1, "weight": 0}
+        rewarded = {"capacity": 1, "weight": -self.LARGE}
+        load_weights = self._w.tolist()
+        load = [{"capacity": 1, "weight": w} for w in load_weights]
+        source, sink = nid("source"), nid("sink")
 
         # --- 1. Initial State (Layer 0) ---
         initial_k = self.capacities.get(1, 1)
 
         # A. Create Split Page Nodes for Layer 0
         for i in range(n):
+            page_in, page_out = nid((0, "page_in", i)), nid((0, "page_out", i))
             # Internal Edge: Page_In -> Page_Out with Cap 1
-            G.add_edge((0, "page_in", i), (0, "page_out", i), capacity=1, weight=0)
-            # Source -> Page_In
-            G.add_edge("source", (0, "page_in", i), capacity=1, weight=0)
+            edges.append((page_in, page_out, {"capacity": 1, "weight": 0}))
+            # Source -> Page_In: starting in the cache is a load at t=1, so
+            # the flow objective matches _calculate_real_cost. Unused units
+            # start in the slot for free instead.
+            edges.append((source, page_in, load[i]))
+            self._positive_cost_edges.append((source, page_in, load_weights[i]))
 
         # B. Create Split Active Slot Node for Layer 0
         slot_cap = max(0, max_k - initial_k)
-        G.add_edge(
-            (0, "slot_in"), (0, "slot_out"), capacity=slot_cap, weight=-self.LARGE
-        )
-        G.add_edge("source", (0, "slot_in"), capacity=max_k, weight=0)
+        slot_in, slot_out = nid((0, "slot_in")), nid((0, "slot_out"))
+        edges.append((slot_in, slot_out, {"capacity": slot_cap, "weight": -self.LARGE}))
+        edges.append((source, slot_in, {"capacity": max_k, "weight": 0}))
 
         # --- 2. Build Layers (Transitions) ---
+        req_idx = self._req_idx.tolist()
         for t in range(T):
-            req = self.requests[t]
-            req_p_idx = self.page_to_idx[req.page.id]
+            req_p_idx = req_idx[t]
 
             # Transitioning from Layer t -> Layer t+1
+            page_out = [nid((t, "page_out", i)) for i in range(n)]
+            next_page_in = [nid((t + 1, "page_in", i)) for i in range(n)]
+            next_page_out = [nid((t + 1, "page_out", i)) for i in range(n)]
+            slot_in, slot_out = nid((t, "slot_in")), nid((t, "slot_out"))
+            next_slot_in = nid((t + 1, "slot_in"))
+            next_slot_out = nid((t + 1, "slot_out"))
+            switch = nid((t, "switch"))
 
             # Create Split Nodes for Layer t+1
             # 1. Page Nodes
             for i in range(n):
-                weight = 0
-                if i == req_p_idx:
-                    weight -= self.LARGE
-                G.add_edge(
-                    (t + 1, "page_in", i),
-                    (t + 1, "page_out", i),
-                    capacity=1,
-                    weight=weight,
-                )
+                data = rewarded if i == req_p_idx else free
+                edges.append((next_page_in[i], next_page_out[i], data))
+            self._internal_edges.extend(zip(next_page_in, next_page_out))
 
             # 2. Active Slot Node
             curr_k = self.capacities.get(t + 1, 1)  # Capacity at step t+1
             # "Active Slot" flow represents items NOT in the main cache (slack)
             # Capacity is max_k - curr_k
             slot_cap = max(0, max_k - curr_k)
-            G.add_edge(
-                (t + 1, "slot_in"),
-                (t + 1, "slot_out"),
-                capacity=slot_cap,
-                weight=-self.LARGE,
+            edges.append(
+                (
+                    next_slot_in,
+                    next_slot_out,
+                    {"capacity": slot_cap, "weight": -self.LARGE},
+                )
             )
 
             # --- Define Edges from Layer t (OUT nodes) to Layer t+1 (IN nodes) ---
-
-            # A. Page to Page (Fully Connected)
-            for i in range(n):
-                for j in range(n):
-                    weight = 0
-                    if i != j:
-                        weight = self.pages[j].weight  # Switching Cost
-
-                    # From Page_Out(t) -> Page_In(t+1)
-                    G.add_edge(
-                        (t, "page_out", i),
-                        (t + 1, "page_in", j),
-                        capacity=1,
-                        weight=weight,
-                    )
+            # Every block below only differs between layers by its node ids,
+            # so the per-page edge data comes from the shared templates.
+
+            # A. Page to Page
+            # Holding page i is free. Switching i -> j (i != j) costs w_j and is
+            # routed through a single Switch node, so the layer needs O(n)
+            # edges instead of the fully connected n^2 block. The detour
+            # i -> Switch -> i costs w_i >= 0 and is never better than holding.
+            edges.extend(zip(page_out, next_page_in, repeat(free)))
+            edges.extend(zip(page_out, repeat(switch), repeat(free)))
+            edges.extend(zip(repeat(switch), next_page_in, load))  # Switching Cost
+            self._positive_cost_edges.extend(
+                zip(repeat(switch), next_page_in, load_weights)
+            )
 
             # B. Page to Active Slot
-            for i in range(n):
-                # Weight 0
-                G.add_edge((t, "page_out", i), (t + 1, "slot_in"), capacity=1, weight=0)
+            edges.extend(zip(page_out, repeat(next_slot_in), repeat(free)))
 
             # C. Active Slot to Page
-            for j in range(n):
-                weight = self.pages[j].weight  # Loading cost
-
-                G.add_edge(
-                    (t, "slot_out"), (t + 1, "page_in", j), capacity=1, weight=weight
-                )
+            edges.extend(zip(repeat(slot_out), next_page_in, load))  # Loading cost
+            self._positive_cost_edges.extend(
+                zip(repeat(slot_out), next_page_in, load_weights)
+            )
 
             # D. Active Slot to Active Slot
-            G.add_edge((t, "slot_out"), (t + 1, "slot_in"), capacity=max_k, weight=0)
-            G.add_edge((t, "slot_in"), (t + 1, "slot_in"), capacity=max_k, weight=0)
+            edges.append((slot_out, next_slot_in, {"capacity": max_k, "weight": 0}))
+            edges.append((slot_in, next_slot_in, {"capacity": max_k, "weight": 0}))
 
         # --- 3. Connect Last Layer to Sink ---
         last_t = T
 
         # Connect Page_Out to Sink
         for i in range(n):
-            G.add_edge((last_t, "page_out", i), "sink", capacity=1, weight=0)
+            page_out = nid((last_t, "page_out", i))
+            edges.append((page_out, sink, {"capacity": 1, "weight": 0}))
 
         # Connect Slot_Out to Sink
-        G.add_edge((last_t, "slot_out"), "sink", capacity=max_k, weight=0)
-        G.add_edge((last_t, "slot_in"), "sink", capacity=max_k, weight=0)
-
+        slot_in, slot_out = nid((last_t, "slot_in")), nid((last_t, "slot_out"))
+        edges.append((slot_out, sink, {"capacity": max_k, "weight": 0}))
+        edges.append((slot_in, sink, {"capacity": max_k, "weight": 0}))
+
+        # Create nodes in id order, keeping the readable keys for the visualizer
+        G.add_nodes_from((i, {"key": key}) for i, key in enumerate(self._id_to_node))
+        G.nodes[source]["demand"] = -max_k
+        G.nodes[sink]["demand"] = max_k
+        G.add_edges_from(edges)
         return G
 
-    def _reconstruct(self, G, flow_dict) -> List[CacheState]:
-        states = []
+    def _node_id(self, key) -> int:
+        v = self._nid.get(key)
+        if v is None:
+            v = self._nid[key] = len(self._id_to_node)
+            self._id_to_node.append(key)
+        return v
+
+    def _occupancy_mask(self, flow_dict) -> np.ndarray:
+        """
+        Returns a (T, n) bool mask, mask[t-1, i] is set iff page i is cached
+        at step t, i.e. flow passes through its internal edge page_in -> page_out.
+        """
         n = len(self.pages)
         T = len(self.requests)
+        return np.fromiter(
+            (flow_dict[u][v] > 0.9 for u, v in self._internal_edges),
+            dtype=bool,
+            count=T * n,
+        ).reshape(T, n)
+
+    def _reconstruct(self, mask: np.ndarray) -> List[CacheState]:
+        T = len(self.requests)
 
+        states = []
         for t in range(1, T + 1):
             k = self.capacities.get(t, 1)
-            pages_in_cache = set()
-
-            for i in range(n):
-                # Check flow passing through the internal node
-                # edge: page_in -> page_out
-                u = (t, "page_in", i)
-                v = (t, "page_out", i)
-
-                flow = 0
-                if flow_dict and u in flow_dict and v in flow_dict[u]:
-                    flow = flow_dict[u][v]
-
-                if flow > 0.9:
-                    pages_in_cache.add(self.idx_to_page[i])
-
+            pages_in_cache = frozenset(
+                [self.idx_to_page[i] for i in np.flatnonzero(mask[t - 1])]
+            )
             states.append(CacheState(t, k, pages_in_cache))
         return states
 
+    def _calculate_real_cost_from_mask(self, mask: np.ndarray) -> float:
+        """
+        Same cost as _calculate_real_cost, computed on the occupancy mask
+        without going through CacheState sets.
+        """
+        if mask.shape[0] == 0:
+            return 0.0
+        return float(load_cost(mask, self._w))
+
     def _calculate_real_cost(
         self, states: List[CacheState], verbose: bool = False
     ) -> float:
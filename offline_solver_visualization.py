@@ -1,4 +1,5 @@
 import networkx as nx
+import numpy as np
 import matplotlib.pyplot as plt
 
 
@@ -12,52 +13,67 @@ def visualize_solution(G, requests, flow_dict=None):
     # (Any weight smaller than -half_large definitely includes it)
     LARGE_THRESHOLD = -500_000
 
-    # Identify layers
-    layers = [n[0] for n in G.nodes if isinstance(n, tuple)]
-    if not layers:
-        return
-    max_layer = max(layers)
-
-    scale_x = 4.0
-    scale_y = 1.0
+    # Solver graphs use integer nodes, their (layer, type, ...) keys are
+    # stored in the "key" node attribute
+    keys = {n: n if k is None else k for n, k in G.nodes(data="key", default=None)}
 
-    pos["source"] = (-scale_x, 0)
-    pos["sink"] = ((max_layer + 1) * scale_x, 0)
-    labels["source"] = "S"
-    labels["sink"] = "T"
-
-    for node in G.nodes:
-        if isinstance(node, str):
-            continue
+    # Partition nodes once: only the layered (tuple) nodes need a layout
+    tuple_nodes = [node for node, key in keys.items() if isinstance(key, tuple)]
+    if not tuple_nodes:
+        return
 
-        # Node structure: (layer, type, index_or_suffix)
-        layer = node[0]
-        ntype = node[1]
+    node_of = {key: node for node, key in keys.items()}
+    source, sink = node_of["source"], node_of["sink"]
 
-        x = layer * scale_x
-        y = 0
+    # Key structure: (layer, type[, index])
+    tuple_keys = [keys[node] for node in tuple_nodes]
+    layer = np.array([key[0] for key in tuple_keys])
+    ntypes = [key[1] for key in tuple_keys]
+    idx = np.array([key[2] if len(key) > 2 else -1 for key in tuple_keys])
+    max_layer = int(layer.max())
 
-        if "page" in ntype:
-            idx = node[2]
-            base_y = (idx + 1) * scale_y + 1
-            if ntype == "page_in":
-                y = base_y + 0.2
-                labels[node] = f"P{idx}_in"
-            else:
-                y = base_y - 0.2
-                x += 0.3  # slight offset
-                labels[node] = f"P{idx}_out"
-
-        elif "slot" in ntype:
-            if ntype == "slot_in":
-                y = -1.5
-                labels[node] = "S_in"
-            else:
-                y = -2.5
-                x += 0.3
-                labels[node] = "S_out"
+    scale_x = 4.0
+    scale_y = 1.0
 
-        pos[node] = (x, y)
+    pos[source] = (-scale_x, 0)
+    pos[sink] = ((max_layer + 1) * scale_x, 0)
+    labels[source] = "S"
+    labels[sink] = "T"
+
+    # Per-type x offset within the layer and y position. Page rows are
+    # stacked by index above the Switch node (between layers t and t+1),
+    # slot nodes sit below it; *_out nodes get a slight offset.
+    type_dx = {
+        "page_in": 0.0,
+        "page_out": 0.3,
+        "slot_in": 0.0,
+        "slot_out": 0.3,
+        "switch": 0.6 * scale_x,
+    }
+    type_y = {
+        "page_in": 0.2,
+        "page_out": -0.2,
+        "slot_in": -1.5,
+        "slot_out": -2.5,
+        "switch": 0.5,
+    }
+    type_label = {
+        "page_in": "P{}_in",
+        "page_out": "P{}_out",
+        "slot_in": "S_in",
+        "slot_out": "S_out",
+        "switch": "Sw",
+    }
+
+    x = layer * scale_x + np.array([type_dx[t] for t in ntypes])
+    page_y = np.where(idx >= 0, (idx + 1) * scale_y + 1, 0)
+    y = page_y + np.array([type_y[t] for t in ntypes])
+
+    pos.update(zip(tuple_nodes, zip(x.tolist(), y.tolist())))
+    labels.update(
+        (node, type_label[t].format(i))
+        for node, t, i in zip(tuple_nodes, ntypes, idx.tolist())
+    )
 
     plt.figure(figsize=(18, 10))
 
@@ -66,7 +82,7 @@ def visualize_solution(G, requests, flow_dict=None):
         G, pos, node_size=250, node_color="#eeeeee", edgecolors="gray"
     )
     nx.draw_networkx_nodes(
-        G, pos, nodelist=["source", "sink"], node_color="orange", node_size=500
+        G, pos, nodelist=[source, sink], node_color="orange", node_size=500
     )
     nx.draw_networkx_labels(G, pos, labels=labels, font_size=7)
 
@@ -75,39 +91,39 @@ def visualize_solution(G, requests, flow_dict=None):
     inactive_edges = []
     edge_cost_labels = {}
 
-    for u, v, d in G.edges(data=True):
-        is_active = False
-        # Check if flow exists and is > 0 (using tolerance for floats)
-        if flow_dict and u in flow_dict and v in flow_dict[u]:
-            if flow_dict[u][v] > 0.9:
-                is_active = True
+    # G.adj is grouped by u, so each node's flows are looked up only once
+    for u, nbrs in G.adj.items():
+        u_flows = flow_dict.get(u, {}) if flow_dict else {}
+        for v, d in nbrs.items():
+            # Check if flow exists and is > 0 (using tolerance for floats)
+            is_active = u_flows.get(v, 0) > 0.9
 
-        if is_active:
-            active_edges.append((u, v))
+            if is_active:
+                active_edges.append((u, v))
 
-            # --- Calculate real transition cost for label ---
-            raw_weight = d.get("weight", 0)
-            real_cost = 0.0
+                # --- Calculate real transition cost for label ---
+                raw_weight = d.get("weight", 0)
+                real_cost = 0.0
 
-            # If weight is very negative, it means it includes the -LARGE reward.
-            # Add LARGE back to get the actual page weight penalty.
-            if raw_weight < LARGE_THRESHOLD:
-                real_cost = float(raw_weight + LARGE_VAL)
-            else:
-                real_cost = float(raw_weight)
-
-            # Only label positive costs (actual penalties) to reduce clutter.
-            # Ignore 0-cost edges (holding pages, internal node edges).
-            if real_cost > 0.001:
-                # Format as integer if it's very close to one for cleaner labels
-                if abs(real_cost - round(real_cost)) < 0.001:
-                    cost_str = f"{int(round(real_cost))}"
+                # If weight is very negative, it means it includes the -LARGE reward.
+                # Add LARGE back to get the actual page weight penalty.
+                if raw_weight < LARGE_THRESHOLD:
+                    real_cost = float(raw_weight + LARGE_VAL)
                 else:
-                    cost_str = f"{real_cost:.1f}"
-                edge_cost_labels[(u, v)] = cost_str
+                    real_cost = float(raw_weight)
+
+                # Only label positive costs (actual penalties) to reduce clutter.
+                # Ignore 0-cost edges (holding pages, internal node edges).
+                if real_cost > 0.001:
+                    # Format as integer if it's very close to one for cleaner labels
+                    if abs(real_cost - round(real_cost)) < 0.001:
+                        cost_str = f"{int(round(real_cost))}"
+                    else:
+                        cost_str = f"{real_cost:.1f}"
+                    edge_cost_labels[(u, v)] = cost_str
 
-        else:
-            inactive_edges.append((u, v))
+            else:
+                inactive_edges.append((u, v))
 
     # Draw Inactive Edges (Faint background)
     nx.draw_networkx_edges(
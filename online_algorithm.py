@@ -1,73 +1,264 @@
 # online_algorithm.py
-from typing import List, Dict, Set, Tuple
-from paging_model import Page, Request, CacheState
+from functools import lru_cache
+from typing import List, Dict, Set, Tuple, Union, Optional
+import numpy as np
+from paging_model import Page, Request, RequestStream, CacheState
 from online_strategies import EvictionOracle, DominationStrategy, FurthestInFutureOracle, NoOpDominationStrategy
+from paging_kernel import HAVE_NUMBA, build_next_occurrence, simulate
+
+@lru_cache(maxsize=None)
+def _make_fixed_pick(n: int):
+    """
+    Compiles pick(cached, next_time, last_req_idx, rank) for exactly n cached
+    pages: the furthest-in-future page, ties to the higher rank, as n - 1
+    unrolled comparisons instead of max() with a key function.
+    """
+    names = [f"c{j}" for j in range(n)]
+    lines = [f"def pick(cached, next_time, last_req_idx, rank):",
+             f"    {', '.join(names)}, = cached",
+             f"    best = c0; bn = next_time[last_req_idx[c0.id]]; br = rank[c0.id]"]
+    for c in names[1:]:
+        lines += [f"    n = next_time[last_req_idx[{c}.id]]; r = rank[{c}.id]",
+                  f"    if n > bn or (n == bn and r > br): best = {c}; bn = n; br = r"]
+    lines.append("    return best")
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["pick"]
 
 class OnlineVariableCacheSystem:
+    # Shorter sequences run in Python: the kernel's compile or cache load
+    # costs more than it saves on them
+    KERNEL_MIN_REQUESTS = 100_000
+
+    # Trace event kind -> message printed in verbose mode
+    EVENT_FORMATS = {
+        'MISS': "[t={t}] MISS: Loaded {p.id}. Cost += {p.weight}",
+        'HIT': "[t={t}] HIT: {p.id} is present.",
+        'RULE1': "    -> Rule 1: Domination by {p.id}",
+        'RULE2': "    -> Rule 2 (Oracle): Evicting {p.id}",
+    }
+
     def __init__(self, 
                  pages: List[Page], 
                  capacities: Dict[int, int],
                  oracle: EvictionOracle = FurthestInFutureOracle(),
-                 domination_strategy: DominationStrategy = NoOpDominationStrategy()):
+                 domination_strategy: DominationStrategy = NoOpDominationStrategy(),
+                 verbose: bool = False):
         
         self.capacities = capacities
         self.oracle = oracle
         self.domination_strategy = domination_strategy
+        self.verbose = verbose
         
         # State
-        self.cache: Set[Page] = set()
+        self.cache: Dict[str, Page] = {} # Map page id -> cached page
+        self.page_rank: Dict[str, int] = {} # Map page id -> rank by (weight, id)
+        self.idx_to_page: List[Page] = [] # Pages by rank
+        self.cache_mask: np.ndarray = np.zeros(0, np.bool_) # Cached pages, by rank
+        self.next_use_for_page: np.ndarray = np.zeros(0, np.int64) # Next request time step, by rank
+        self._rank_range: np.ndarray = np.zeros(0, np.int64) # Tie-break term of the argmax keys
         self.total_cost = 0.0
         self.history: List[CacheState] = []
-        self.labels: Dict[int, float] = {} # Map request_index -> label value
+        self.trace: List[Tuple[int, str, Page]] = [] # (time step, event kind, page)
+        self._need_history = True # Whether run() records history and trace
+        self.labels: np.ndarray = np.zeros(0) # Label value by request index
+        self.next_occurrence: np.ndarray = np.empty(0, np.int32) # Map request index -> index of the page's next request
+        self.last_req_idx: Dict[str, int] = {} # Map page id -> index of its latest request
+        self._next_time: List[int] = [] # Map request index -> time step of the page's next request
+        self._stream: Optional[RequestStream] = None # Sequence of the current run
+        self._requests: Optional[List[Request]] = None # Same, as Request objects once a strategy needs them
+
+        # With a constant capacity k every FIF eviction picks among k + 1 pages
+        ks = set(capacities.values())
+        self._pick_size = ks.pop() + 1 if len(ks) == 1 else 0
+        self._pick = _make_fixed_pick(self._pick_size) if self._pick_size > 1 else None
+        # Otherwise the built-in FIF evicts by argmax, the arrays above are only kept up to date then
+        self._use_argmax = self._pick is None and type(oracle) is FurthestInFutureOracle
 
-    def run(self, requests: List[Request]) -> Tuple[float, List[CacheState]]:
-        print("\n--- Starting Online Simulation ---")
+    def run(self, requests: Union[List[Request], RequestStream],
+            need_history: bool = True) -> Tuple[float, Optional[List[CacheState]]]:
+        """
+        Serves requests and returns the total cost and the cache history.
+        With need_history=False no history or trace is recorded and None is
+        returned in place of the history.
+        """
+        self._need_history = need_history
+        if self.verbose:
+            print("\n--- Starting Online Simulation ---")
+
+        stream = requests if isinstance(requests, RequestStream) else RequestStream.from_requests(requests)
+        T = len(stream)
         
-        # Initialize labels for all requests to 0
-        for req in requests:
-            self.labels[req.index] = 0.0
+        # Initialize labels for all requests to 0. labels is indexed by
+        # Request.index, so it grows to the largest index and keeps the
+        # labels of earlier runs, like a dict keyed by index would.
+        if isinstance(requests, RequestStream):
+            indices = np.arange(T)
+        else:
+            indices = np.fromiter((req.index for req in requests), np.int64, T)
+        if T and indices.min() < 0:
+            raise ValueError("Request indices must be non-negative")
+        size = int(indices.max()) + 1 if T else 0
+        if size > len(self.labels):
+            labels = np.zeros(size)
+            labels[:len(self.labels)] = self.labels
+            self.labels = labels
+        self.labels[indices] = 0.0
+
+        # Furthest-in-future tie-break order: max weight, then max id
+        ranked = sorted({*stream.pages, *self.cache.values()}, key=lambda p: (p.weight, p.id))
+        self.page_rank = {p.id: r for r, p in enumerate(ranked)}
+        self.idx_to_page = ranked
+
+        # Plain Furthest-In-Future from an empty cache runs in the compiled kernel
+        if (HAVE_NUMBA and not self.cache and T >= self.KERNEL_MIN_REQUESTS
+                and type(self.oracle) is FurthestInFutureOracle
+                and type(self.domination_strategy) is NoOpDominationStrategy):
+            return self._run_kernel(stream, ranked)
 
-        for i, req in enumerate(requests):
-            t = req.time_step
+        # Domination strategies still walk Request objects, built on first use
+        self._stream = stream
+        self._requests = requests if isinstance(requests, list) else None
+
+        # Next request of every request's page, in one reverse pass
+        self.next_occurrence = build_next_occurrence(stream.page_ids)
+        time_steps = stream.time_steps.tolist()
+        # Pages never requested again get a small int past the latest step, not
+        # inf. Time steps need not increase, so this is the max, not the last.
+        never = max(time_steps) + 1 if T else 1
+        self._next_time = [time_steps[j] if j < T else never
+                           for j in self.next_occurrence.tolist()]
+
+        pages = stream.pages
+        page_ids = stream.page_ids.tolist()
+
+        # FIF keys by rank: cached pages only, next use then rank
+        P = len(ranked)
+        self.cache_mask = np.zeros(P, np.bool_)
+        self.next_use_for_page = np.full(P, never, np.int64)
+        self._rank_range = np.arange(P, dtype=np.int64)
+        if self.cache:
+            # Pages cached by an earlier run are next used at their first request
+            first_time = {}
+            for pid, t in zip(reversed(page_ids), reversed(time_steps)):
+                first_time[pages[pid].id] = t
+            for p in self.cache.values():
+                self.last_req_idx[p.id] = len(self._next_time)
+                self._next_time.append(first_time.get(p.id, never))
+                if self._use_argmax:
+                    r = self.page_rank[p.id]
+                    self.cache_mask[r] = True
+                    self.next_use_for_page[r] = self._next_time[-1]
+        cache = self.cache
+        use_argmax = self._use_argmax
+        prev_k_t = float('inf') # Forces a capacity check on the first step
+        for i in range(T):
+            page = pages[page_ids[i]]
+            pid = page.id
+            t = time_steps[i]
             k_t = self.capacities.get(t, 1)
+            self.last_req_idx[pid] = i
+            if use_argmax:
+                r = self.page_rank[pid]
+                self.next_use_for_page[r] = self._next_time[i]
             
             # 1. Load Page
-            if req.page not in self.cache:
-                self.cache.add(req.page)
-                self.total_cost += req.page.weight
-                print(f"[t={t}] MISS: Loaded {req.page.id}. Cost += {req.page.weight}")
+            # A single probe: setdefault only grows the cache on a miss
+            n_cached = len(cache)
+            cache.setdefault(pid, page)
+            loaded_this_step = len(cache) != n_cached
+            if loaded_this_step:
+                if use_argmax:
+                    self.cache_mask[r] = True
+                self.total_cost += page.weight
+                self._log(t, 'MISS', page)
             else:
-                print(f"[t={t}] HIT: {req.page.id} is present.")
+                self._log(t, 'HIT', page)
 
             # 2. Maintain Capacity
-            while len(self.cache) > k_t:
-                self._evict(i, t, requests)
+            # The cache fit prev_k_t, so it can only overflow after a load
+            # or when the capacity shrinks
+            if loaded_this_step or k_t < prev_k_t:
+                while len(self.cache) > k_t:
+                    self._evict(i, t)
+            prev_k_t = k_t
 
             # Record state
-            self.history.append(CacheState(t, k_t, set(self.cache)))
+            if need_history:
+                self.history.append(CacheState(t, k_t, frozenset(self.cache.values())))
 
-        return self.total_cost, self.history
+        return self.total_cost, self.history if need_history else None
 
-    def _evict(self, current_req_idx: int, current_time: int, all_requests: List[Request]):
-        future_reqs = all_requests[current_req_idx+1:]
-        
+    def _run_kernel(self, stream: RequestStream, ranked: List[Page]) -> Tuple[float, Optional[List[CacheState]]]:
+        # The kernel numbers pages in tie-break order: by weight, then id
+        rank_of = np.array([self.page_rank[p.id] for p in stream.pages], dtype=np.int64)
+        page_ids = rank_of[stream.page_ids]
+        time_steps = stream.time_steps.astype(np.int64)
+        weights = np.array([p.weight for p in ranked], dtype=np.float64)
+        capacities = np.fromiter((self.capacities.get(t, 1) for t in time_steps.tolist()), np.int64, len(stream))
+
+        cost, evict_step, evict_page, n_evictions, in_cache = simulate(
+            page_ids, build_next_occurrence(page_ids), time_steps, weights, capacities)
+        self.total_cost += float(cost)
+
+        if not (self._need_history or self.verbose):
+            # Nothing to record or print, only the final cache is kept
+            self.cache = {ranked[r].id: ranked[r] for r in np.flatnonzero(in_cache).tolist()}
+            return self.total_cost, None
+
+        evict_step = evict_step[:n_evictions].tolist()
+        evict_page = evict_page[:n_evictions].tolist()
+
+        # Replay the kernel's evictions to record the trace and history
+        ev = 0
+        for i, (r, t, k_t) in enumerate(zip(page_ids.tolist(), time_steps.tolist(), capacities.tolist())):
+            page = ranked[r]
+            n_cached = len(self.cache)
+            self.cache.setdefault(page.id, page)
+            if len(self.cache) != n_cached:
+                self._log(t, 'MISS', page)
+            else:
+                self._log(t, 'HIT', page)
+
+            while ev < n_evictions and evict_step[ev] == i:
+                q = ranked[evict_page[ev]]
+                del self.cache[q.id]
+                self._log(t, 'RULE2', q)
+                ev += 1
+
+            if self._need_history:
+                self.history.append(CacheState(t, k_t, frozenset(self.cache.values())))
+
+        return self.total_cost, self.history if self._need_history else None
+
+    def _evict(self, current_req_idx: int, current_time: int):
         # Rule 1: Check Domination
-        dom_result = self.domination_strategy.find_domination(
-            self.cache, future_reqs, self.labels
-        )
+        if type(self.domination_strategy) is NoOpDominationStrategy:
+            dom_result = None # Never dominates, skip building its arguments
+        else:
+            if self._requests is None:
+                self._requests = self._stream.to_requests()
+            dom_result = self.domination_strategy.find_domination(
+                self.cache.values(), self._requests, current_req_idx + 1, self.labels
+            )
+
+        # Next use of every cached page, built once and shared by both rules
+        next_use = None
+        if dom_result or type(self.oracle) is not FurthestInFutureOracle:
+            next_use = self._compute_next_use(self.cache.values())
 
         if dom_result:
             p, chains = dom_result
-            print(f"    -> Rule 1: Domination by {p.id}")
+            self._log(current_time, 'RULE1', p)
             
             # Find q in cache with w_q <= w_p maximizing next request time
-            candidates = [q for q in self.cache if q.weight <= p.weight]
+            candidates = [q for q in self.cache.values() if q.weight <= p.weight]
             if not candidates:
                 q = p # Fallback
             else:
-                q = self._get_furthest(candidates, future_reqs)
+                q = self._get_furthest(candidates, next_use)
                 
-            self.cache.remove(q)
+            self._remove(q)
             
             # Update labels
             for chain in chains:
@@ -75,14 +266,49 @@ class OnlineVariableCacheSystem:
                     self.labels[r.index] = p.weight
         else:
             # Rule 2: Oracle
-            q = self.oracle.select_eviction(self.cache, current_time, future_reqs)
-            print(f"    -> Rule 2 (Oracle): Evicting {q.id}")
-            self.cache.remove(q)
+            if type(self.oracle) is FurthestInFutureOracle and self._pick is not None:
+                # Same choice as the oracle's scan, unrolled for constant capacity
+                cached = list(self.cache.values())
+                if len(cached) == self._pick_size:
+                    q = self._pick(cached, self._next_time, self.last_req_idx, self.page_rank)
+                else: # Time steps missing from capacities fall back to k=1
+                    q = max(cached, key=lambda p: (self._next_use(p), self.page_rank[p.id]))
+            elif self._use_argmax and type(self.oracle) is FurthestInFutureOracle:
+                # Same choice as the oracle's scan, as one argmax over
+                # next_use * P + rank, non-cached pages masked out
+                keys = self.next_use_for_page * len(self.idx_to_page) + self._rank_range
+                q = self.idx_to_page[int(np.argmax(np.where(self.cache_mask, keys, -1)))]
+            else:
+                if next_use is None:
+                    next_use = self._compute_next_use(self.cache.values())
+                q = self.oracle.select_eviction(self.cache.values(), current_time, next_use)
+            self._log(current_time, 'RULE2', q)
+            self._remove(q)
+
+    def _remove(self, q: Page):
+        del self.cache[q.id]
+        if self._use_argmax:
+            self.cache_mask[self.page_rank[q.id]] = False
+
+    def _log(self, t: int, kind: str, page: Page):
+        # Events are recorded as tuples and only formatted when printed
+        if self._need_history:
+            self.trace.append((t, kind, page))
+        if self.verbose:
+            print(self.EVENT_FORMATS[kind].format(t=t, p=page))
+
+    def format_trace(self) -> str:
+        return "\n".join(self.EVENT_FORMATS[kind].format(t=t, p=page) for t, kind, page in self.trace)
+
+    def _next_use(self, p: Page) -> int:
+        # Time step of p's next request after its latest one, past the last step if none
+        return self._next_time[self.last_req_idx[p.id]]
+
+    def _compute_next_use(self, pages) -> Dict[Page, int]:
+        return {p: self._next_use(p) for p in pages}
 
-    def _get_furthest(self, pages: List[Page], future_reqs: List[Request]) -> Page:
+    def _get_furthest(self, pages: List[Page], precomputed_next_use: Optional[Dict[Page, int]] = None) -> Page:
         # Helper to find furthest page among specific candidates
-        next_use = {p: float('inf') for p in pages}
-        for r in future_reqs:
-            if r.page in next_use and next_use[r.page] == float('inf'):
-                next_use[r.page] = r.time_step
-        return max(pages, key=lambda p: next_use[p])
+        if precomputed_next_use is None:
+            return max(pages, key=self._next_use)
+        return max(pages, key=precomputed_next_use.__getitem__)
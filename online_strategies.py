@@ -1,28 +1,37 @@
 from abc import ABC, abstractmethod
-from typing import Set, List, Dict, Optional, Tuple, Any
+from typing import Set, List, Dict, Optional, Tuple, Any, Collection
+import numpy as np
 from paging_model import Page, Request, Chain
 
 class EvictionOracle(ABC):
     """
     Abstract interface for Subroutine F: Determines which page to evict
     when no domination rule applies.
+    next_use maps each cached page to the time step of its next request
+    after current_time. Pages never requested again share one value larger
+    than every time step of the sequence.
     """
     @abstractmethod
     def select_eviction(self, 
-                        current_cache: Set[Page], 
+                        current_cache: Collection[Page], 
                         current_time: int, 
-                        future_requests: List[Request]) -> Page:
+                        next_use: Dict[Page, int]) -> Page:
         pass
 
 class DominationStrategy(ABC):
     """
     Abstract interface for finding if a page dominates a set of chains.
+    The future requests are all_requests[start_idx:], passed without slicing.
+    labels[i] is the current label of the request with index i. labels is a
+    dense array sized by the largest Request.index seen, so indices should be
+    non-negative and close to 0..T-1.
     """
     @abstractmethod
     def find_domination(self, 
-                        current_cache: Set[Page], 
-                        future_requests: List[Request],
-                        labels: Dict[int, float]) -> Optional[Tuple[Page, List[Chain]]]:
+                        current_cache: Collection[Page], 
+                        all_requests: List[Request],
+                        start_idx: int,
+                        labels: np.ndarray) -> Optional[Tuple[Page, List[Chain]]]:
         pass
 
 # --- Concrete Implementations ---
@@ -31,13 +40,7 @@ class FurthestInFutureOracle(EvictionOracle):
     """
     Standard greedy heuristic: evict the page requested furthest in the future.
     """
-    def select_eviction(self, current_cache: Set[Page], current_time: int, future_requests: List[Request]) -> Page:
-        next_use = {p: float('inf') for p in current_cache}
-        
-        for req in future_requests:
-            if req.page in current_cache and next_use[req.page] == float('inf'):
-                next_use[req.page] = req.time_step
-        
+    def select_eviction(self, current_cache: Collection[Page], current_time: int, next_use: Dict[Page, int]) -> Page:
         # Evict page with max distance to next use.
         # Tie-break: max weight (greedy heuristic), then ID.
         return max(current_cache, key=lambda p: (next_use[p], p.weight, p.id))
@@ -48,5 +51,5 @@ class NoOpDominationStrategy(DominationStrategy):
     This reduces the algorithm to just using the Oracle (Rule 2).
     Implement a complex flow-based checker here to enable Rule 1.
     """
-    def find_domination(self, current_cache, future_requests, labels):
+    def find_domination(self, current_cache, all_requests, start_idx, labels):
         return None
@@ -0,0 +1,146 @@
+# paging_kernel.py
+# Numba-compiled hot loops shared by the online and offline solvers.
+# Numba is optional: without it the kernels run as plain Python/NumPy.
+import os
+import numpy as np
+
+try:
+    from numba import njit
+
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# Numba's on-disk cache can crash on some setups, allow turning it off
+CACHE_KERNELS = not os.environ.get("PAGING_DISABLE_CACHE")
+
+
+def njit_serial(func):
+    """Compiles func in nopython mode, single-threaded, with the disk cache."""
+    return njit(cache=CACHE_KERNELS, parallel=False)(func)
+
+
+# Bit index of a uint64 power of two: (bit * _DEBRUIJN) >> 58 is unique per bit
+_ONE = np.uint64(1)
+_DEBRUIJN = np.uint64(0x03F79D71B4CB0A89)
+_DEBRUIJN_INDEX = np.empty(64, np.int64)
+for _i in range(64):
+    _DEBRUIJN_INDEX[((0x03F79D71B4CB0A89 << _i) & 0xFFFFFFFFFFFFFFFF) >> 58] = _i
+
+
+@njit_serial
+def load_cost(mask, weights):
+    """
+    Paging cost of a (T, n) occupancy mask: everything cached at t=1 is
+    loaded, afterwards every page that enters the cache is loaded.
+    """
+    cost = (mask[0] * weights).sum()
+    for t in range(1, mask.shape[0]):
+        cost += ((mask[t] & ~mask[t - 1]) * weights).sum()
+    return cost
+
+
+def build_next_occurrence(page_ids: np.ndarray) -> np.ndarray:
+    """
+    nxt[i] is the index of the next request j > i of page page_ids[i],
+    or T if the page is never requested again. Plain NumPy, so callers
+    that never reach a kernel don't pay for compiling one.
+    """
+    T = len(page_ids)
+    nxt = np.full(T, T, np.int32)
+    # A stable sort lists every page's requests in order, each followed by
+    # its next occurrence unless the page changes
+    order = np.argsort(page_ids, kind="stable")
+    same = page_ids[order[1:]] == page_ids[order[:-1]]
+    nxt[order[:-1][same]] = order[1:][same]
+    return nxt
+
+
+@njit_serial
+def furthest_in_mask(bits, next_use):
+    """
+    Index of the set bit of bits with the largest next_use, ties to the
+    larger index. Visits only the set bits, lowest first.
+    """
+    victim = -1
+    while bits:
+        lsb = bits & (~bits + _ONE)
+        q = _DEBRUIJN_INDEX[(lsb * _DEBRUIJN) >> np.uint64(58)]
+        if victim < 0 or next_use[q] >= next_use[victim]:
+            victim = q
+        bits ^= lsb
+    return victim
+
+
+@njit_serial
+def simulate(page_ids, nxt, time_steps, weights, capacities):
+    """
+    Online paging with Furthest-In-Future eviction over integer-encoded
+    requests. page_ids[i] indexes weights, and pages must be numbered in
+    tie-break order: among equally far next uses the larger id is evicted.
+    nxt is build_next_occurrence(page_ids).
+    capacities[i] is the cache size after request i. With at most 64 pages
+    the cache is also kept as a uint64 bitset and evictions scan only its
+    set bits instead of every page.
+
+    Returns (cost, evict_step, evict_page, n_evictions, in_cache): the j-th
+    eviction (j < n_evictions) removes evict_page[j] while serving request
+    evict_step[j], and in_cache is the final cache as a bool mask.
+    """
+    T = page_ids.shape[0]
+    P = weights.shape[0]
+
+    # Next use of request i's page, as a time step (never = past the latest)
+    never = time_steps.max() + 1 if T > 0 else 1
+    next_occurrence = np.empty(T, np.int64)
+    for i in range(T):
+        next_occurrence[i] = time_steps[nxt[i]] if nxt[i] < T else never
+
+    in_cache = np.zeros(P, np.bool_)
+    use_bits = P <= 64
+    bits = np.uint64(0)
+    next_use = np.zeros(P, np.int64)
+    size = 0
+    cost = 0.0
+    evict_step = np.empty(T, np.int64)
+    evict_page = np.empty(T, np.int64)
+    n_evictions = 0
+
+    prev_k = np.iinfo(np.int64).max
+    for i in range(T):
+        p = page_ids[i]
+        k = capacities[i]
+
+        loaded = not in_cache[p]
+        if loaded:
+            in_cache[p] = True
+            if use_bits:
+                bits |= _ONE << np.uint64(p)
+            size += 1
+            cost += weights[p]
+        next_use[p] = next_occurrence[i]
+
+        if loaded or k < prev_k:
+            while size > k:
+                if use_bits:
+                    victim = furthest_in_mask(bits, next_use)
+                    bits ^= _ONE << np.uint64(victim)
+                else:
+                    victim = -1
+                    for q in range(P):
+                        if in_cache[q] and (victim < 0 or next_use[q] >= next_use[victim]):
+                            victim = q
+                in_cache[victim] = False
+                size -= 1
+                evict_step[n_evictions] = i
+                evict_page[n_evictions] = victim
+                n_evictions += 1
+        prev_k = k
+
+    return cost, evict_step, evict_page, n_evictions, in_cache
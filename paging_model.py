@@ -1,22 +1,38 @@
-from dataclasses import dataclass, field
-from typing import Set, List
+import sys
+from dataclasses import dataclass, field, FrozenInstanceError
+from typing import Set, List, FrozenSet
+import numpy as np
 
-@dataclass(frozen=True)
 class Page:
-    """Represents a unique page with a specific weight."""
-    id: str
-    weight: float
+    """Represents a unique page with a specific weight. Pages are immutable."""
+    __slots__ = ('id', 'weight', '_h')
+
+    def __init__(self, id: str, weight: float):
+        object.__setattr__(self, 'id', sys.intern(id))
+        object.__setattr__(self, 'weight', weight)
+        object.__setattr__(self, '_h', hash(self.id)) # Pages are hashed on every cache probe
+
+    def __setattr__(self, name, value):
+        # A changed id would leave the cached hash stale
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+    def __delattr__(self, name):
+        raise FrozenInstanceError(f"cannot delete field '{name}'")
 
     def __hash__(self):
-        return hash(self.id)
+        return self._h
+
+    def __reduce__(self):
+        # Recompute the cached hash on unpickling, str hashes are per-process
+        return (Page, (self.id, self.weight))
     
     def __eq__(self, other):
-        return isinstance(other, Page) and self.id == other.id
+        return isinstance(other, Page) and self._h == other._h and self.id == other.id
     
     def __repr__(self):
         return f"{self.id}(w={self.weight})"
 
-@dataclass
+@dataclass(slots=True)
 class Request:
     """Represents a request at a specific time step."""
     index: int          # Global sequence index (0, 1, ... T-1)
@@ -26,27 +42,71 @@ class Request:
     def __repr__(self):
         return f"Req(t={self.time_step}, {self.page.id})"
 
-@dataclass
+@dataclass(eq=False)
+class RequestStream:
+    """
+    A request sequence stored as parallel arrays indexed by request index:
+    request i asks for pages[page_ids[i]] at time_steps[i].
+    """
+    pages: List[Page]
+    page_ids: np.ndarray    # int32 indices into pages
+    time_steps: np.ndarray  # int32
+
+    @classmethod
+    def from_requests(cls, requests: List[Request]) -> "RequestStream":
+        pages = list(dict.fromkeys(r.page for r in requests))
+        page_idx = {p.id: i for i, p in enumerate(pages)}
+        T = len(requests)
+        return cls(
+            pages,
+            np.fromiter((page_idx[r.page.id] for r in requests), np.int32, T),
+            np.fromiter((r.time_step for r in requests), np.int32, T),
+        )
+
+    def to_requests(self) -> List[Request]:
+        """Compatibility shim for code that walks Request objects."""
+        pages = self.pages
+        return [Request(i, pages[pid], t)
+                for i, (pid, t) in enumerate(zip(self.page_ids.tolist(), self.time_steps.tolist()))]
+
+    def __len__(self):
+        return len(self.page_ids)
+
+    def __repr__(self):
+        return repr(self.to_requests())
+
 class Chain:
-    """Represents a Chain of requests for the Domination Strategy."""
-    requests: List[Request]
+    """
+    Represents a Chain of requests for the Domination Strategy.
+    cost and interval are computed once, so requests must not change afterwards.
+    """
+    __slots__ = ('requests', '_cost', '_interval')
+
+    def __init__(self, requests: List[Request]):
+        self.requests = requests
+        self._cost = sum(r.page.weight for r in requests)
+        self._interval = (requests[0].time_step, requests[-1].time_step) if requests else (0, 0)
 
     @property
     def cost(self) -> float:
-        return sum(r.page.weight for r in self.requests)
+        return self._cost
 
     @property
     def interval(self):
-        if not self.requests:
-            return (0, 0)
-        return (self.requests[0].time_step, self.requests[-1].time_step)
+        return self._interval
+
+    def __eq__(self, other):
+        return isinstance(other, Chain) and self.requests == other.requests
+
+    def __repr__(self):
+        return f"Chain(requests={self.requests!r})"
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CacheState:
     """Used for reporting results."""
     time_step: int
     capacity: int
-    pages: Set[Page]
+    pages: FrozenSet[Page]
 
     def __repr__(self):
         p_ids = sorted([p.id for p in self.pages])
@@ -1,45 +1,58 @@
+from functools import lru_cache
 from typing import List, Tuple
-from paging_model import Page, Request
+import numpy as np
+from paging_model import Page, RequestStream
 
 
 def generate_recursive_sequence(
     n_pages: int, t: int, a: int
-) -> Tuple[List[Page], List[Request]]:
+) -> Tuple[List[Page], RequestStream]:
     """
     Generates a recursive sequence where between every two consecutive requests
     of page P_i (weight t^i), there are exactly a requests of page P_{i-1}.
+    The requests come back as a RequestStream; use .to_requests() for a list.
     """
-    m = int(a)
-
-    # Create Pages P1..Pn with weights t^1...t^n
+    # Create Pages P1..Pn with weights t^1...t^n. Only the index arrays are
+    # cached, every call gets its own (cheap) pages.
     pages = [Page(f"P{i}", float(t**i)) for i in range(1, n_pages + 1)]
 
-    def build_sequence(level: int) -> List[Page]:
-        # Base Case: Level 1 (Weight t^1)
-        # Sequence S1 must contain 'm' instances of P1 to satisfy upper levels
-        if level == 1:
-            return [pages[0]] * m
-
-        # Recursive Step
-        # S_i = S_{i-1} + (P_i + S_{i-1}) * m
-        # This ensures there are 'm' instances of P_i, separated by S_{i-1}
-        # S_{i-1} contains 'm' instances of P_{i-1}, satisfying the condition.
-
-        prev_seq = build_sequence(level - 1)
-        current_page = pages[level - 1]
-
-        new_seq = []
-        new_seq.append(current_page)
-        for _ in range(m - 1):
-            new_seq.extend(prev_seq)
-            new_seq.append(current_page)
+    raw_pages, time_steps = _build_raw_pages(n_pages, a)
+    requests = RequestStream(pages, raw_pages, time_steps)
 
-        return new_seq
+    return pages, requests
 
-    # Generate raw page sequence
-    raw_pages = build_sequence(n_pages)
 
-    # Convert to Request objects
-    requests = [Request(i, p, i + 1) for i, p in enumerate(raw_pages)]
+@lru_cache(maxsize=16)
+def _build_raw_pages(n_pages: int, a: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Builds the page-index and time-step arrays once per (n_pages, a); they
+    don't depend on t. The arrays are shared between calls, so
+    they are returned read-only.
+    """
+    m = int(a)
 
-    return pages, requests
+    # S_1 is 'm' instances of P1 and S_i = P_i + (S_{i-1} + P_i) * (m - 1),
+    # so |S_1| = m and |S_i| = m + (m - 1) * |S_{i-1}|.
+    lengths = [m]
+    for _ in range(1, n_pages):
+        lengths.append(m + (m - 1) * lengths[-1])
+
+    # Build S_1..S_n bottom-up, as page indices, inside one array of the
+    # final length: S_{i-1} always sits at the front, and level i copies it
+    # into its m - 1 gaps between the 'm' instances of P_i.
+    raw_pages = np.zeros(lengths[-1], dtype=np.int32)
+    for level in range(2, n_pages + 1):
+        prev_len = lengths[level - 2]
+        stride = prev_len + 1
+
+        prev_seq = raw_pages[:prev_len].copy()
+        for c in range(m - 1):
+            start = c * stride + 1
+            raw_pages[start : start + prev_len] = prev_seq
+        raw_pages[: m * stride : stride] = level - 1
+
+    time_steps = np.arange(1, len(raw_pages) + 1, dtype=np.int32)
+    for arr in (raw_pages, time_steps):
+        arr.flags.writeable = False
+
+    return raw_pages, time_steps
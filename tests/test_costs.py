@@ -0,0 +1,169 @@
+import contextlib
+import io
+import unittest
+from itertools import product
+from unittest import mock
+
+import offline_solver
+import online_algorithm
+from main import run_experiment
+from offline_solver import OfflineOptimalSolver
+from online_algorithm import OnlineVariableCacheSystem
+from online_strategies import DominationStrategy
+from paging_model import Chain, Page, Request
+from recursive_request_sequence import generate_recursive_sequence
+
+# (N, t, a) -> (online cost, optimal cost) with constant k=2, as printed by main.py
+EXPECTED_SWEEP = {
+    (2, 2, 2): (6.0, 6.0),
+    (2, 2, 3): (6.0, 6.0),
+    (2, 3, 2): (12.0, 12.0),
+    (2, 3, 3): (12.0, 12.0),
+    (3, 2, 2): (22.0, 18.0),
+    (3, 2, 3): (30.0, 32.0),
+    (3, 3, 2): (66.0, 48.0),
+    (3, 3, 3): (93.0, 84.0),
+}
+
+
+def _quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+class HeaviestDominates(DominationStrategy):
+    """The heaviest cached page always dominates the next request's chain."""
+
+    def find_domination(self, current_cache, all_requests, start_idx, labels):
+        p = max(current_cache, key=lambda q: (q.weight, q.id))
+        return p, [Chain(all_requests[start_idx : start_idx + 1])]
+
+
+def _recursive_case(N, t, a, k=2):
+    pages, requests = generate_recursive_sequence(N, t, a)
+    capacities = {i: k for i in range(1, len(requests) + 2)}
+    return pages, requests, capacities
+
+
+class MainExperimentTest(unittest.TestCase):
+    def test_default_experiment(self):
+        self.assertEqual(_quiet(run_experiment), (30.0, 32.0))
+
+    def test_sweep_grid(self):
+        for params in product([2, 3], [2, 3], [2, 3]):
+            with self.subTest(params=params):
+                costs = run_experiment(*params, verbose=False)
+                self.assertEqual(costs, EXPECTED_SWEEP[params])
+
+
+class OnlineTest(unittest.TestCase):
+    def test_kernel_and_python_paths_agree(self):
+        for params, (online_cost, _) in EXPECTED_SWEEP.items():
+            pages, requests, capacities = _recursive_case(*params)
+            runs = []
+            for have_numba in (True, False):
+                with mock.patch.object(online_algorithm, "HAVE_NUMBA", have_numba):
+                    system = OnlineVariableCacheSystem(pages, capacities)
+                    system.KERNEL_MIN_REQUESTS = 0
+                    runs.append(system.run(requests))
+                    quiet = OnlineVariableCacheSystem(pages, capacities)
+                    quiet.KERNEL_MIN_REQUESTS = 0
+                    self.assertEqual(
+                        quiet.run(requests, need_history=False), (online_cost, None)
+                    )
+                    self.assertEqual(quiet.cache, system.cache)
+            with self.subTest(params=params):
+                self.assertEqual(runs[0][0], online_cost)
+                self.assertEqual(runs[1][0], online_cost)
+                self.assertEqual(runs[0][1], runs[1][1])
+
+
+    def test_second_run_on_warm_cache(self):
+        # Pages left cached by the first run are next used at their first
+        # request in the second one
+        weights = {"A": 1.0, "B": 2.0, "C": 4.0, "D": 3.0}
+        pages = {pid: Page(pid, w) for pid, w in weights.items()}
+
+        def requests(sequence):
+            return [Request(i, pages[pid], i + 1) for i, pid in enumerate(sequence)]
+
+        first = [["A"], ["A", "B"], ["A", "B"], ["A", "B"]]
+        cases = [
+            # Variable capacity, evictions by masked argmax
+            (
+                {1: 2, 2: 3, 3: 2, 4: 2, 5: 1, 6: 3},
+                "argmax",
+                first
+                + [["A"], ["A", "D"], ["A", "C", "D"], ["A", "D"], ["A", "D"], ["A"]],
+            ),
+            # Constant capacity, evictions by the unrolled pick
+            (
+                {t: 2 for t in range(1, 7)},
+                "pick",
+                first + [["A", "B"]] + [["A", "D"]] * 4 + [["A", "B"]],
+            ),
+        ]
+        for capacities, path, expected_history in cases:
+            with self.subTest(path=path):
+                system = OnlineVariableCacheSystem(list(pages.values()), capacities)
+                self.assertEqual(system._use_argmax, path == "argmax")
+                self.assertEqual(system.run(requests("ABCAD"))[0], 10.0)
+                cost, history = system.run(requests("DCADB"))
+                self.assertEqual(cost, 19.0)
+                self.assertEqual(
+                    [sorted(p.id for p in state.pages) for state in history],
+                    expected_history,
+                )
+
+
+    def test_rule1_labels_by_request_index(self):
+        # Request indices need not start at 0, and labels survive later runs
+        pages = [Page("A", 1.0), Page("B", 2.0), Page("C", 3.0)]
+        capacities = {t: 1 for t in range(1, 6)}
+        system = OnlineVariableCacheSystem(
+            pages, capacities, domination_strategy=HeaviestDominates()
+        )
+        first = [Request(100 + i, pages[j], i + 1) for i, j in enumerate([0, 1, 2, 0])]
+        self.assertEqual(system.run(first)[0], 6.0)
+        self.assertEqual(system.labels[100:].tolist(), [0.0, 0.0, 2.0, 3.0])
+
+        second = [Request(i, pages[j], i + 1) for i, j in enumerate([1, 2, 0])]
+        cost, history = system.run(second)
+        self.assertEqual(cost, 11.0)
+        self.assertEqual(system.labels[:3].tolist(), [0.0, 2.0, 3.0])
+        self.assertEqual(system.labels[100:].tolist(), [0.0, 0.0, 2.0, 3.0])
+        self.assertEqual([sorted(p.id for p in s.pages) for s in history], [["A"]] * 7)
+
+
+class OfflineTest(unittest.TestCase):
+    def test_backends_agree(self):
+        # Tied flow optima used to differ in real cost between backends
+        pages = [Page(f"Q{i}", float(w)) for i, w in enumerate([5, 2, 2, 5, 3, 1])]
+        sequence = [1, 1, 1, 3, 5, 5, 5, 5, 0]
+        requests = [Request(i, pages[j], i + 1) for i, j in enumerate(sequence)]
+        capacities = {1: 3, 2: 3, 3: 3, 4: 1, 5: 3, 6: 1, 7: 2, 8: 2, 9: 3, 10: 2}
+        costs = []
+        for backend in (offline_solver.min_cost_flow, None):
+            with mock.patch.object(offline_solver, "min_cost_flow", backend):
+                solver = OfflineOptimalSolver(pages, requests, capacities)
+                costs.append(solver.solve(verbose=False)[0])
+        self.assertEqual(costs, [13.0, 13.0])
+
+    def test_cost_matches_schedule_and_flow(self):
+        for params, (_, optimal_cost) in EXPECTED_SWEEP.items():
+            pages, requests, capacities = _recursive_case(*params)
+            solver = OfflineOptimalSolver(pages, requests, capacities)
+            cost, states = solver.solve(verbose=False)
+            G, flow = solver.get_graph_for_viz()
+            with self.subTest(params=params):
+                self.assertEqual(cost, optimal_cost)
+                self.assertEqual(solver._calculate_real_cost(states, False), cost)
+                self.assertEqual(solver._calculate_real_cost_from_flow(G, flow), cost)
+                cost_only, _ = OfflineOptimalSolver(
+                    pages, requests.to_requests(), capacities
+                ).solve(verbose=False, need_states=False)
+                self.assertEqual(cost_only, cost)
+
+
+if __name__ == "__main__":
+    unittest.main()